@@ -0,0 +1,287 @@
+"""
+Booking Analytics Rollups
+
+Counter-only summary collections, small enough for dashboards to read without
+touching the booking collection:
+
+`booking_daily`, one document per UTC day:
+
+    {"_id": "2026-10-19", "total": 42,
+     "by_category": {"supercar": 30, ...},
+     "by_source": {"web": 28, ...}}
+
+`booking_monthly_vehicle`, one document per (UTC month, vehicle):
+
+    {"month": "2026-10", "slug": "mclaren-720s", "n": 7}
+
+`booking_rollup`, one marker per counted booking (`_id` is the booking id), which
+makes counting idempotent: the marker insert and the `$inc`s run in one transaction
+on replica sets; on a standalone server the marker goes first and any applied
+`$inc` is compensated if a later step fails.
+
+Bookings are bucketed by their `created_at` in both the live job and backfill.
+
+Backfill historical data (rebuilds whole months from the booking collection and
+writes markers for every booking it counts; needs MongoDB 4.2+ for `$merge`).
+Stop the job queue first: live rollups that land while it runs are overwritten.
+    python analytics.py backfill --since 2025-01-01
+"""
+import argparse
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from catalog import get_vehicles_by_slug
+from jobs import task
+
+logger = logging.getLogger(__name__)
+
+DAILY_COLLECTION = "booking_daily"
+VEHICLE_COLLECTION = "booking_monthly_vehicle"
+MARKER_COLLECTION = "booking_rollup"
+UNKNOWN = "unknown"
+
+_indexes_ready = False
+_transactions: Optional[bool] = None
+
+
+def _require_db():
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        db[VEHICLE_COLLECTION].create_index([("month", ASCENDING), ("slug", ASCENDING)], unique=True)
+        db[VEHICLE_COLLECTION].create_index([("month", ASCENDING), ("n", DESCENDING)])
+        _indexes_ready = True
+
+
+def _transactions_supported() -> bool:
+    """Multi-document transactions need a replica set or a sharded cluster"""
+    global _transactions
+    if _transactions is None:
+        try:
+            hello = db.command("hello")
+            _transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        except Exception:
+            _transactions = False
+    return _transactions
+
+
+def _key(value: Optional[str]) -> str:
+    """Make a value safe to use as a MongoDB field name"""
+    if not value:
+        return UNKNOWN
+    return value.replace(".", "_").lstrip("$") or UNKNOWN
+
+
+def _day(moment: datetime) -> str:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).date().isoformat()
+
+
+def _booking_day(booking_id: str) -> str:
+    """UTC day of the booking's `created_at`, the same field backfill groups on"""
+    oid = ObjectId(booking_id)
+    booking = db["booking"].find_one({"_id": oid}, {"created_at": 1})
+    created = booking.get("created_at") if booking else None
+    return _day(created or oid.generation_time)
+
+
+def _counter_writes(day: str, slug: str, category: Optional[str], source: Optional[str]) -> List[tuple]:
+    """(collection, filter, increments) for every counter a booking touches"""
+    return [
+        (DAILY_COLLECTION, {"_id": day}, {
+            "total": 1,
+            f"by_category.{_key(category)}": 1,
+            f"by_source.{_key(source)}": 1,
+        }),
+        (VEHICLE_COLLECTION, {"month": day[:7], "slug": slug}, {"n": 1}),
+    ]
+
+
+def _apply_in_transaction(booking_id: str, day: str, writes: List[tuple]):
+    def body(session):
+        db[MARKER_COLLECTION].insert_one({"_id": booking_id, "day": day}, session=session)
+        for collection, filter_dict, inc in writes:
+            db[collection].update_one(filter_dict, {"$inc": inc}, upsert=True, session=session)
+
+    with db.client.start_session() as session:
+        session.with_transaction(body)
+
+
+def _apply_with_compensation(booking_id: str, day: str, writes: List[tuple]):
+    # The marker claims the booking; if a counter write fails, undo the ones that
+    # landed and release the claim so the retried job starts clean
+    db[MARKER_COLLECTION].insert_one({"_id": booking_id, "day": day})
+    applied = []
+    try:
+        for collection, filter_dict, inc in writes:
+            db[collection].update_one(filter_dict, {"$inc": inc}, upsert=True)
+            applied.append((collection, filter_dict, inc))
+    except Exception:
+        try:
+            for collection, filter_dict, inc in applied:
+                db[collection].update_one(filter_dict, {"$inc": {k: -v for k, v in inc.items()}})
+            db[MARKER_COLLECTION].delete_one({"_id": booking_id})
+        except Exception:
+            logger.exception("Could not roll back partial rollup of booking %s", booking_id)
+        raise
+
+
+@task("analytics.rollup_booking", on=("booking.created",))
+def rollup_booking(payload: dict):
+    """Add one booking to its day's and month's counters, at most once"""
+    _require_db()
+    _ensure_indexes()
+
+    booking_id = payload["booking_id"]
+    if db[MARKER_COLLECTION].count_documents({"_id": booking_id}, limit=1):
+        return
+
+    slug = payload.get("vehicle_slug")
+    category = None
+    if slug:
+        docs, _ = get_vehicles_by_slug([slug])
+        category = docs[0].get("category") if docs else None
+
+    day = _booking_day(booking_id)
+    writes = _counter_writes(day, slug or UNKNOWN, category, payload.get("source"))
+    apply = _apply_in_transaction if _transactions_supported() else _apply_with_compensation
+    try:
+        apply(booking_id, day, writes)
+    except DuplicateKeyError:
+        # Another attempt counted this booking first
+        pass
+
+
+def backfill(since: Optional[datetime] = None) -> int:
+    """Rebuild rollups from the booking collection. Returns the number of days written.
+
+    `since` is rounded down to the start of its month so monthly vehicle buckets are
+    rebuilt whole. Grouping stays inside MongoDB; Python only holds the per-day
+    category and source counters.
+    """
+    _require_db()
+    _ensure_indexes()
+
+    if since is not None:
+        since = since.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        match = [{"$match": {"created_at": {"$gte": since}}}]
+    else:
+        match = [{"$match": {"created_at": {"$ne": None}}}]
+    day_expr = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+    month_expr = {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}}
+
+    # Markers, so jobs recovered after the backfill skip bookings it already counted
+    db["booking"].aggregate(match + [
+        {"$project": {"_id": {"$toString": "$_id"}, "day": day_expr}},
+        {"$merge": {"into": MARKER_COLLECTION, "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True)
+
+    db["booking"].aggregate(match + [
+        {"$group": {"_id": {"month": month_expr, "slug": {"$ifNull": ["$vehicle_slug", UNKNOWN]}}, "n": {"$sum": 1}}},
+        {"$project": {"_id": 0, "month": "$_id.month", "slug": "$_id.slug", "n": 1}},
+        {"$merge": {"into": VEHICLE_COLLECTION, "on": ["month", "slug"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True)
+
+    # Category and source counters: at most days x categories x sources rows
+    days: Dict[str, dict] = {}
+    rows = db["booking"].aggregate(match + [
+        {"$lookup": {"from": "vehicle", "localField": "vehicle_slug", "foreignField": "slug", "as": "vehicle"}},
+        {"$group": {
+            "_id": {"day": day_expr, "category": {"$arrayElemAt": ["$vehicle.category", 0]}, "source": "$source"},
+            "n": {"$sum": 1},
+        }},
+    ], allowDiskUse=True)
+    for row in rows:
+        group = row["_id"]
+        doc = days.setdefault(group["day"], {"total": 0, "by_category": {}, "by_source": {}})
+        n = row["n"]
+        doc["total"] += n
+        for field, value in (("by_category", group.get("category")), ("by_source", group.get("source"))):
+            k = _key(value)
+            doc[field][k] = doc[field].get(k, 0) + n
+
+    for day, doc in days.items():
+        db[DAILY_COLLECTION].replace_one({"_id": day}, doc, upsert=True)
+    return len(days)
+
+
+def _merge(into: Dict[str, int], counts: Dict[str, int]):
+    for k, v in counts.items():
+        into[k] = into.get(k, 0) + v
+
+
+def _months(start, end) -> List[str]:
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def summary(days: int = 30, top_vehicles: int = 20) -> dict:
+    """Dashboard numbers for the last `days` UTC days, read from the rollups.
+
+    Reads one document per day, plus `top_vehicles` documents per calendar month
+    touched by the window (an indexed sort on the monthly vehicle buckets).
+    """
+    _require_db()
+
+    today = datetime.now(timezone.utc).date()
+    start = today - timedelta(days=days - 1)
+    docs = {d["_id"]: d for d in db[DAILY_COLLECTION].find({"_id": {"$gte": start.isoformat(), "$lte": today.isoformat()}})}
+
+    series = []
+    by_category: Dict[str, int] = {}
+    by_source: Dict[str, int] = {}
+    for i in range(days):
+        day = (start + timedelta(days=i)).isoformat()
+        doc = docs.get(day, {})
+        series.append({"day": day, "total": doc.get("total", 0)})
+        _merge(by_category, doc.get("by_category", {}))
+        _merge(by_source, doc.get("by_source", {}))
+
+    top_by_month = {
+        month: [
+            {"vehicle_slug": d["slug"], "bookings": d["n"]}
+            for d in db[VEHICLE_COLLECTION].find({"month": month}).sort("n", DESCENDING).limit(top_vehicles)
+        ]
+        for month in _months(start, today)
+    }
+    return {
+        "from": start.isoformat(),
+        "to": today.isoformat(),
+        "total": sum(d["total"] for d in series),
+        "per_day": series,
+        "by_category": by_category,
+        "by_source": by_source,
+        "top_vehicles_by_month": top_by_month,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking analytics rollups")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_backfill = sub.add_parser("backfill", help="Rebuild rollups from the booking collection")
+    p_backfill.add_argument("--since", help="ISO date; rebuilds from the start of its month on")
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        since = datetime.fromisoformat(args.since).replace(tzinfo=timezone.utc) if args.since else None
+        print(json.dumps({"days": backfill(since)}))
+
+
+if __name__ == "__main__":
+    main()
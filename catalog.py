@@ -0,0 +1,88 @@
+"""
+Vehicle Catalog Lookups
+
+Per-slug vehicle cache shared by the single and batch lookup endpoints and the
+pricing engine. Cached entries are served first; whatever is left is resolved
+with one `$in` query. Entries live for 60 s, so `status` or `price_per_day`
+changed outside this process can be served stale for up to a minute.
+
+The catalog version is bumped whenever this process changes the vehicle
+collection, so caches keyed by it (e.g. encoded /vehicles bodies) never serve
+stale catalogs written through the API.
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from database import get_documents
+
+
+class VehicleCache:
+    """Thread-safe TTL cache of vehicle documents keyed by slug"""
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, slugs: Iterable[str]) -> Dict[str, dict]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for slug in slugs:
+                entry = self._entries.get(slug)
+                if entry and now - entry[1] < self.ttl_seconds:
+                    found[slug] = entry[0]
+        return found
+
+    def put_many(self, docs: Dict[str, dict]):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) + len(docs) > self.max_entries:
+                self._entries.clear()
+            for slug, doc in docs.items():
+                self._entries[slug] = (doc, now)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+vehicle_cache = VehicleCache()
+
+_catalog_version = 0
+_version_lock = threading.Lock()
+
+
+def catalog_version() -> int:
+    return _catalog_version
+
+
+def invalidate_catalog():
+    """Drop cached vehicles and move to a new catalog version"""
+    global _catalog_version
+    with _version_lock:
+        _catalog_version += 1
+    vehicle_cache.invalidate()
+
+
+def get_vehicles_by_slug(slugs: List[str]) -> Tuple[List[dict], List[str]]:
+    """Resolve slugs to vehicle documents, cache first, then a single `$in` query.
+
+    Returns (documents in requested order, missing slugs in requested order).
+    Duplicate slugs are resolved once.
+    """
+    ordered = list(dict.fromkeys(slugs))
+    found = vehicle_cache.get_many(ordered)
+    pending = [s for s in ordered if s not in found]
+    if pending:
+        loaded = {}
+        for d in get_documents("vehicle", {"slug": {"$in": pending}}):
+            d.pop("_id", None)
+            loaded[d["slug"]] = d
+        vehicle_cache.put_many(loaded)
+        found.update(loaded)
+    docs = [found[s] for s in ordered if s in found]
+    missing = [s for s in ordered if s not in found]
+    return docs, missing
@@ -9,7 +9,7 @@ from pymongo import MongoClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import Iterable, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -53,3 +53,26 @@ def get_documents(collection_name: str, filter_dict: dict = None, limit: int = N
         cursor = cursor.limit(limit)
     
     return list(cursor)
+
+def create_documents(collection_name: str, items: Iterable[Union[BaseModel, dict]], batch_size: int = 1000):
+    """Bulk insert documents with timestamps, in batches. Returns the number inserted.
+
+    Timestamps already present on a dict (e.g. backdated generated data) are kept.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    now = datetime.now(timezone.utc)
+    inserted = 0
+    batch = []
+    for data in items:
+        data_dict = data.model_dump() if isinstance(data, BaseModel) else data.copy()
+        data_dict.setdefault('created_at', now)
+        data_dict.setdefault('updated_at', data_dict['created_at'])
+        batch.append(data_dict)
+        if len(batch) >= batch_size:
+            inserted += len(db[collection_name].insert_many(batch, ordered=False).inserted_ids)
+            batch = []
+    if batch:
+        inserted += len(db[collection_name].insert_many(batch, ordered=False).inserted_ids)
+    return inserted
@@ -0,0 +1,376 @@
+"""
+Synthetic Dataset Generator for Royer Exotics
+
+Produces realistic Vehicle, Testimonial and Booking datasets at configurable scale,
+bulk-loads them into the configured database and runs a scaling matrix that shows
+how endpoint latency and memory grow with data size.
+
+Category and slug popularity are skewed (Zipf-like) so a handful of cars and
+categories attract most bookings, as in production.
+
+Usage:
+    python datagen.py generate --vehicles 100000 --bookings 10000000 --out data/
+    python datagen.py load --vehicles 100000 --bookings 10000000 --drop
+    python datagen.py matrix --sizes 1000,10000,100000 --bookings-per-vehicle 100 --drop
+
+`load` and `matrix` write to DATABASE_NAME; point it at a scratch database. `matrix`
+drops and reloads the catalog, booking, job and rollup collections at every size,
+so it refuses to run without `--drop`.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Callable, Dict, Iterator, List
+
+from schemas import Vehicle, Testimonial, Booking
+
+# Category -> (relative weight, price range per day, makes/models)
+CATEGORIES = {
+    "supercar": (0.45, (899, 2999), [
+        ("Lamborghini", ["Huracán EVO", "Huracán STO", "Aventador S", "Revuelto"]),
+        ("Ferrari", ["488 GTB", "F8 Tributo", "SF90 Stradale", "296 GTB", "Roma"]),
+        ("McLaren", ["720S", "750S", "Artura", "GT"]),
+        ("Porsche", ["911 Turbo S", "911 GT3 RS"]),
+    ]),
+    "suv": (0.30, (499, 1799), [
+        ("Rolls-Royce", ["Cullinan"]),
+        ("Lamborghini", ["Urus", "Urus Performante"]),
+        ("Mercedes-AMG", ["G63", "GLS 63"]),
+        ("Bentley", ["Bentayga"]),
+        ("Range Rover", ["Autobiography", "SV"]),
+    ]),
+    "executive": (0.17, (399, 1299), [
+        ("Mercedes-Benz", ["S580", "Maybach S680"]),
+        ("Bentley", ["Flying Spur", "Continental GT"]),
+        ("Rolls-Royce", ["Ghost", "Phantom", "Wraith"]),
+    ]),
+    "muscle": (0.08, (199, 599), [
+        ("Ford", ["Mustang GT", "Shelby GT500"]),
+        ("Dodge", ["Challenger SRT Hellcat", "Charger Scat Pack"]),
+        ("Chevrolet", ["Camaro ZL1", "Corvette Z06"]),
+    ]),
+}
+
+ENGINES = ["V8", "V8 Twin-Turbo", "V10", "V12", "V8 Hybrid", "Flat-6 Turbo", "V8 Supercharged"]
+FEATURES = [
+    "Apple CarPlay", "Carbon Ceramic Brakes", "GPS Tracking", "Burmester Audio", "Night Package",
+    "Launch Control", "Lift System", "Starlight Headliner", "Performance Exhaust", "Race Mode",
+    "Adaptive Air Suspension", "Bang & Olufsen", "Rear Entertainment", "Chauffeur Ready",
+]
+LOCATIONS = ["West Hollywood, CA", "Beverly Hills, CA", "Santa Monica, CA", "Miami, FL", "Las Vegas, NV"]
+SOURCES = ["web", "whatsapp", "phone", "instagram"]
+SOURCE_WEIGHTS = [0.62, 0.2, 0.1, 0.08]
+FIRST_NAMES = ["Alex", "Dana", "Jordan", "Sam", "Taylor", "Morgan", "Riley", "Casey", "Jamie", "Avery"]
+LAST_INITIALS = "ABCDEFGHJKLMNPRSTW"
+COMMENTS = [
+    "Flawless delivery to my shoot in West Hollywood.",
+    "Concierge service was next level. Best rates in LA.",
+    "Booked for a music video – punctual, insured, professional.",
+    "Car was spotless and the handover took five minutes.",
+    "Made our anniversary weekend unforgettable.",
+]
+PLATFORMS = ["Google", "Instagram", "Yelp", None]
+
+
+def _photo_url(rng: random.Random) -> str:
+    return (
+        f"https://images.unsplash.com/photo-{rng.randint(1500000000000, 1699999999999)}"
+        f"-{rng.getrandbits(48):012x}?q=80&w=1920&auto=format&fit=crop"
+    )
+
+
+def zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    """Cumulative Zipf weights for ranks 1..n, suitable for random.choices(cum_weights=...)"""
+    return list(accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def generate_vehicles(count: int, seed: int = 42) -> Iterator[Vehicle]:
+    """Yield `count` Vehicles with unique slugs and a skewed category mix"""
+    rng = random.Random(seed)
+    names = list(CATEGORIES)
+    weights = [CATEGORIES[c][0] for c in names]
+    seen: Dict[str, int] = {}
+    for _ in range(count):
+        category = rng.choices(names, weights)[0]
+        _, (lo, hi), lineup = CATEGORIES[category]
+        make, models = rng.choice(lineup)
+        model = rng.choice(models)
+        year = rng.randint(2015, 2025)
+        base = f"{make}-{model}-{year}".lower().replace(" ", "-").replace("é", "e").replace("á", "a")
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        slug = base if n == 0 else f"{base}-{n}"
+        yield Vehicle(
+            slug=slug,
+            make=make,
+            model=model,
+            year=year,
+            category=category,
+            price_per_day=rng.randrange(lo, hi, 50),
+            status=rng.choices(["available", "booked", "maintenance"], [0.85, 0.12, 0.03])[0],
+            horsepower=rng.randint(400, 1000),
+            zero_to_sixty=round(rng.uniform(2.4, 5.5), 1),
+            seats=rng.choice([2, 2, 4, 5]),
+            engine=rng.choice(ENGINES),
+            thumbnails=[_photo_url(rng) for _ in range(rng.randint(1, 3))],
+            gallery=[_photo_url(rng) for _ in range(rng.randint(2, 6))],
+            features=rng.sample(FEATURES, 3),
+            location=rng.choice(LOCATIONS),
+        )
+
+
+def generate_testimonials(count: int, seed: int = 42) -> Iterator[Testimonial]:
+    rng = random.Random(seed + 1)
+    for _ in range(count):
+        yield Testimonial(
+            name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_INITIALS)}.",
+            rating=rng.choices([5, 4.9, 4.8, 4.5, 4], [0.6, 0.15, 0.1, 0.1, 0.05])[0],
+            comment=rng.choice(COMMENTS),
+            platform=rng.choice(PLATFORMS),
+        )
+
+
+def generate_bookings(
+    count: int, slugs: List[str], seed: int = 42, days_back: int = 365, chunk: int = 10000
+) -> Iterator[dict]:
+    """Yield booking documents for `slugs`, Zipf-skewed by slug rank and backdated over `days_back` days.
+
+    Documents carry `created_at` so the bulk loader keeps the spread instead of stamping now.
+    """
+    rng = random.Random(seed + 2)
+    cum = zipf_weights(len(slugs))
+    now = datetime.now(timezone.utc)
+    remaining = count
+    while remaining > 0:
+        n = min(chunk, remaining)
+        remaining -= n
+        for slug in rng.choices(slugs, cum_weights=cum, k=n):
+            created = now - timedelta(seconds=rng.randint(0, days_back * 86400))
+            start = created.date() + timedelta(days=rng.randint(1, 60))
+            end = start + timedelta(days=rng.choices([1, 2, 3, 4, 7, 14], [0.3, 0.25, 0.2, 0.1, 0.1, 0.05])[0])
+            first = rng.choice(FIRST_NAMES)
+            booking = Booking(
+                vehicle_slug=slug,
+                full_name=f"{first} {rng.choice(LAST_INITIALS)}.",
+                email=f"{first.lower()}{rng.randint(1, 999999)}@example.com",
+                phone=f"+1310{rng.randint(1000000, 9999999)}",
+                start_date=start.isoformat(),
+                end_date=end.isoformat(),
+                delivery=rng.choice([None, "Pickup", "LAX", "Beverly Hills Hotel"]),
+                source=rng.choices(SOURCES, SOURCE_WEIGHTS)[0],
+            ).model_dump()
+            booking["created_at"] = created
+            yield booking
+
+
+def _dump(model) -> dict:
+    # mode="json" turns HttpUrl fields into plain strings that BSON can encode
+    return model.model_dump(mode="json")
+
+
+def write_jsonl(path: str, docs) -> int:
+    n = 0
+    with open(path, "w") as f:
+        for d in docs:
+            f.write(json.dumps(_dump(d) if not isinstance(d, dict) else d, default=str) + "\n")
+            n += 1
+    return n
+
+
+def load(vehicles: int, bookings: int, testimonials: int, seed: int = 42, drop: bool = False) -> Dict[str, int]:
+    """Generate and bulk insert a dataset. Returns inserted counts per collection."""
+    from database import db, create_documents
+
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    if drop:
+        for name in ("vehicle", "testimonial", "booking", "job", "booking_daily", "booking_monthly_vehicle", "booking_rollup"):
+            db[name].drop()
+
+    cars = [_dump(v) for v in generate_vehicles(vehicles, seed)]
+    slugs = [c["slug"] for c in cars]
+    counts = {
+        "vehicles": create_documents("vehicle", cars),
+        "testimonials": create_documents("testimonial", (_dump(t) for t in generate_testimonials(testimonials, seed))),
+        "bookings": create_documents("booking", generate_bookings(bookings, slugs, seed), batch_size=5000),
+    }
+    db["vehicle"].create_index("slug", unique=True)
+    db["vehicle"].create_index("category")
+
+    from catalog import invalidate_catalog
+    invalidate_catalog()
+    return counts
+
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> Dict[str, float]:
+    """First-call and median latency (ms) and peak traced allocation (KiB) of `fn`.
+
+    The first call is reported separately because cached endpoints are only cold once.
+    Latency is timed without tracemalloc, which slows allocation-heavy handlers
+    several-fold; memory comes from one extra traced call.
+    """
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"first_ms": timings[0], "ms": statistics.median(timings), "peak_kib": peak / 1024}
+
+
+def endpoint_cases(slugs: List[str]) -> Dict[str, Callable[[], object]]:
+    """In-process calls into the API handlers exercised by the scaling matrix"""
+    import main as api
+    from starlette.requests import Request
+
+    # /vehicles negotiates on headers; a gzip-accepting client matches typical browsers
+    request = Request({"type": "http", "headers": [(b"accept-encoding", b"gzip")]})
+    hot, cold = slugs[0], slugs[-1]
+    probe = Booking(vehicle_slug=hot, full_name="Bench Mark", email="bench@example.com", source="web")
+
+    # A comparison page: 50 cars across the popularity curve, 10 date ranges each
+    compared = slugs[::max(1, len(slugs) // 50)][:50]
+    today = datetime.now(timezone.utc).date()
+    ranges = [(today + timedelta(days=7 * i), today + timedelta(days=7 * i + 1 + i)) for i in range(10)]
+    quotes = api.QuoteBatch(items=[
+        api.QuoteRequest(vehicle_slug=slug, start_date=start.isoformat(), end_date=end.isoformat(), fulfillment="delivery", delivery="LAX")
+        for slug in compared
+        for start, end in ranges
+    ])
+    return {
+        "GET /vehicles": lambda: api.list_vehicles(request, None),
+        "GET /vehicles?category=muscle": lambda: api.list_vehicles(request, "muscle"),
+        "GET /vehicles/{hot}": lambda: api.get_vehicle(hot),
+        "GET /vehicles/{cold}": lambda: api.get_vehicle(cold),
+        "GET /vehicles/batch (50)": lambda: api.get_vehicles_batch(",".join(compared)),
+        "POST /quotes (50x10)": lambda: api.create_quotes(quotes),
+        "GET /categories": api.get_categories,
+        "GET /admin/analytics?days=30": lambda: api.booking_analytics(days=30, top=20),
+        "GET /admin/analytics?days=366": lambda: api.booking_analytics(days=366, top=20),
+        "POST /book": lambda: api.book_now(probe),
+    }
+
+
+def _wait_for_jobs(job_queue, timeout: float = 60.0):
+    """Block until the job queue has nothing queued, deferred, running or awaiting retry"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = job_queue.stats()
+        if not (stats["queue_depth"] or stats["deferred"] or stats["in_flight"] or stats["awaiting_retry"]):
+            return
+        time.sleep(0.05)
+
+
+def matrix(sizes: List[int], bookings_per_vehicle: int, repeat: int, seed: int = 42, drop: bool = False) -> List[dict]:
+    """Reload the dataset at each size, rebuild analytics rollups and measure every endpoint case.
+
+    Every size drops the existing collections first, so `drop` must be passed explicitly.
+    The job queue runs during the cases so POST /book follow-up jobs complete
+    instead of piling up as queued records in the scratch database.
+    """
+    if not drop:
+        raise Exception(
+            f"matrix drops and reloads the collections in database '{os.getenv('DATABASE_NAME')}'; pass drop=True (--drop) to confirm."
+        )
+
+    import analytics
+    from jobs import job_queue
+
+    rows = []
+    for size in sizes:
+        n_bookings = size * bookings_per_vehicle
+        t0 = time.perf_counter()
+        load(size, n_bookings, max(3, size // 100), seed, drop=True)
+        load_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        analytics.backfill()
+        backfill_s = time.perf_counter() - t0
+
+        slugs = [v.slug for v in generate_vehicles(size, seed)]
+        job_queue.start(recover=False)
+        try:
+            for name, fn in endpoint_cases(slugs).items():
+                rows.append({
+                    "vehicles": size, "bookings": n_bookings, "endpoint": name,
+                    "load_s": round(load_s, 1), "backfill_s": round(backfill_s, 1), **measure(fn, repeat),
+                })
+            _wait_for_jobs(job_queue)
+        finally:
+            job_queue.stop()
+    return rows
+
+
+def _print_rows(rows: List[dict]):
+    print(f"{'vehicles':>9} {'bookings':>10}  {'endpoint':<32} {'first ms':>10} {'median ms':>10} {'peak KiB':>10}")
+    size = None
+    for r in rows:
+        if r["vehicles"] != size:
+            size = r["vehicles"]
+            print(f"# {size} vehicles: load {r['load_s']}s, analytics backfill {r['backfill_s']}s")
+        print(f"{r['vehicles']:>9} {r['bookings']:>10}  {r['endpoint']:<32} {r['first_ms']:>10.2f} {r['ms']:>10.2f} {r['peak_kib']:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic data generator and scaling matrix")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_sizes(p):
+        p.add_argument("--vehicles", type=int, default=100000)
+        p.add_argument("--bookings", type=int, default=10000000)
+        p.add_argument("--testimonials", type=int, default=1000)
+        p.add_argument("--seed", type=int, default=42)
+
+    p_gen = sub.add_parser("generate", help="Write JSONL files")
+    add_sizes(p_gen)
+    p_gen.add_argument("--out", default="data")
+
+    p_load = sub.add_parser("load", help="Bulk insert into DATABASE_NAME")
+    add_sizes(p_load)
+    p_load.add_argument("--drop", action="store_true", help="Drop existing catalog, booking, job and rollup collections first")
+
+    p_matrix = sub.add_parser("matrix", help="Reload at several sizes and measure endpoints")
+    p_matrix.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated vehicle counts")
+    p_matrix.add_argument("--bookings-per-vehicle", type=int, default=100)
+    p_matrix.add_argument("--repeat", type=int, default=5)
+    p_matrix.add_argument("--seed", type=int, default=42)
+    p_matrix.add_argument("--json", action="store_true", help="Print rows as JSON instead of a table")
+    p_matrix.add_argument("--drop", action="store_true", help="Confirm dropping the catalog, booking, job and rollup collections in DATABASE_NAME")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        os.makedirs(args.out, exist_ok=True)
+        cars = list(generate_vehicles(args.vehicles, args.seed))
+        slugs = [v.slug for v in cars]
+        counts = {
+            "vehicles": write_jsonl(os.path.join(args.out, "vehicle.jsonl"), cars),
+            "testimonials": write_jsonl(os.path.join(args.out, "testimonial.jsonl"), generate_testimonials(args.testimonials, args.seed)),
+            "bookings": write_jsonl(os.path.join(args.out, "booking.jsonl"), generate_bookings(args.bookings, slugs, args.seed)),
+        }
+        print(json.dumps(counts))
+    elif args.command == "load":
+        print(json.dumps(load(args.vehicles, args.bookings, args.testimonials, args.seed, args.drop)))
+    elif args.command == "matrix":
+        if not args.drop:
+            parser.error(f"matrix drops and reloads collections in database '{os.getenv('DATABASE_NAME')}'; pass --drop to confirm")
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+        rows = matrix(sizes, args.bookings_per_vehicle, args.repeat, args.seed, drop=True)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            _print_rows(rows)
+
+
+if __name__ == "__main__":
+    main()
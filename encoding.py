@@ -0,0 +1,153 @@
+"""
+Response Encoding
+
+Content negotiation for large, repetitive payloads such as the vehicle catalog:
+- `Accept: application/msgpack` gets a MessagePack body (when `msgpack` is installed)
+- `Accept-Encoding` picks brotli (when `brotli` is installed) or gzip for bodies
+  above MIN_COMPRESS_BYTES
+
+Encoded bodies are cached per (catalog version, resource key, media type, encoding),
+so a catalog is serialized and compressed once per version instead of per request.
+A short TTL bounds staleness from writes made outside this process.
+"""
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack")
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _parse_header(value: str) -> dict:
+    """Parse an Accept-style header into {token: q}"""
+    parsed = {}
+    for part in value.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, val = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        parsed[token] = q
+    return parsed
+
+
+def choose_media_type(accept: str) -> str:
+    if msgpack is None or not accept:
+        return JSON
+    offered = _parse_header(accept)
+    msgpack_q = max(offered.get(m, 0.0) for m in MSGPACK_ALIASES)
+    json_q = max(offered.get(JSON, 0.0), offered.get("application/*", 0.0), offered.get("*/*", 0.0))
+    return MSGPACK if msgpack_q > 0 and msgpack_q >= json_q else JSON
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    offered = _parse_header(accept_encoding or "")
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = "identity", 0.0
+    for enc in candidates:
+        q = offered.get(enc, offered.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def serialize(data: Any, media_type: str) -> bytes:
+    if media_type == MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+class EncodedCache:
+    """Small thread-safe LRU of encoded bodies with a TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, body: bytes):
+        with self._lock:
+            self._entries[key] = (body, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+encoded_cache = EncodedCache()
+
+
+def encoded_response(request: Request, version: int, key: Hashable, produce: Callable[[], Any]) -> Response:
+    """Build a negotiated response for `key` at `version`.
+
+    `produce` returns JSON-compatible data and is only called on a cache miss.
+    """
+    media_type = choose_media_type(request.headers.get("accept", ""))
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+
+    body = encoded_cache.get((version, key, media_type, encoding))
+    if body is None:
+        raw = encoded_cache.get((version, key, media_type, "identity"))
+        if raw is None:
+            raw = serialize(produce(), media_type)
+            encoded_cache.put((version, key, media_type, "identity"), raw)
+        if encoding != "identity" and len(raw) >= MIN_COMPRESS_BYTES:
+            body = compress(raw, encoding)
+        else:
+            body, encoding = raw, "identity"
+        encoded_cache.put((version, key, media_type, encoding), body)
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
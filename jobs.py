@@ -0,0 +1,361 @@
+"""
+Background Jobs
+
+Bounded worker pool for follow-up work that should not run on the request path
+(confirmation emails, CRM sync, availability updates, analytics).
+
+Register a task and subscribe it to an event:
+
+    @task("send_confirmation", on=("booking.created",))
+    def send_confirmation(payload: dict):
+        ...
+
+Handlers then call `job_queue.emit("booking.created", payload)`, which persists one
+job record per subscribed task and returns immediately. When the bounded queue is
+full, jobs wait in an overflow buffer that workers move back into the queue as it
+drains, so bursts delay work instead of dropping it. Failed jobs are retried
+with exponential backoff, scheduled by a single timer thread. Job records live in the `job` collection, or in a local
+JSON lines file when MongoDB is not configured, and unfinished jobs are re-queued
+on startup, so delivery is at-least-once: tasks must be idempotent.
+"""
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_tasks: Dict[str, Callable[[dict], None]] = {}
+_subscriptions: Dict[str, List[str]] = {}
+
+
+def task(name: str, on: Iterable[str] = ()):
+    """Register a background task, optionally subscribed to events"""
+    def decorator(fn: Callable[[dict], None]):
+        _tasks[name] = fn
+        for event in on:
+            _subscriptions.setdefault(event, []).append(name)
+        return fn
+    return decorator
+
+
+class MongoJobStore:
+    """Job records in a MongoDB collection, keyed by job id"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def create(self, records: List[dict]):
+        self.collection.insert_many([dict(r) for r in records])
+
+    def update(self, job_id: str, fields: dict):
+        self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    def unfinished(self) -> List[dict]:
+        # Called once per start; creating the index here keeps imports free of network calls
+        self.collection.create_index("status")
+        return list(self.collection.find({"status": {"$in": [QUEUED, RUNNING]}}))
+
+    def counts(self) -> Dict[str, int]:
+        return {d["_id"]: d["n"] for d in self.collection.aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}])}
+
+
+class FileJobStore:
+    """JSON lines stand-in used when MongoDB is not configured.
+
+    Changes are appended to the file. `unfinished()`, called on every start, rewrites
+    it to hold only unfinished jobs, so it never grows past one run's history.
+    Status counts are kept in memory and cover the file as loaded plus this run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open: Dict[str, dict] = {}
+        self._counts: Dict[str, int] = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        records: Dict[str, dict] = {}
+        skipped = 0
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    records.setdefault(entry["_id"], {}).update(entry)
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+        for r in records.values():
+            self._count(r.get("status"), 1)
+            if r.get("status") in (QUEUED, RUNNING):
+                self._open[r["_id"]] = r
+        if skipped:
+            # Usually a line torn by a crash mid-append; rewrite the file so the next
+            # append does not land on the end of the broken line
+            logger.warning("Skipped %d unreadable line(s) in %s", skipped, self.path)
+            self._rewrite(records.values())
+
+    def _rewrite(self, records: Iterable[dict]):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            for r in records:
+                f.write(json.dumps(r, default=str) + "\n")
+        os.replace(tmp, self.path)
+
+    def _count(self, status: str, delta: int):
+        if status:
+            self._counts[status] = self._counts.get(status, 0) + delta
+
+    def _append(self, entries: List[dict]):
+        with open(self.path, "a") as f:
+            for e in entries:
+                f.write(json.dumps(e, default=str) + "\n")
+
+    def create(self, records: List[dict]):
+        with self._lock:
+            self._append(records)
+            for r in records:
+                self._open[r["_id"]] = dict(r)
+                self._count(r["status"], 1)
+
+    def update(self, job_id: str, fields: dict):
+        with self._lock:
+            self._append([{"_id": job_id, **fields}])
+            record = self._open.get(job_id)
+            if record is None:
+                return
+            if "status" in fields:
+                self._count(record.get("status"), -1)
+                self._count(fields["status"], 1)
+            record.update(fields)
+            if record.get("status") not in (QUEUED, RUNNING):
+                del self._open[job_id]
+
+    def unfinished(self) -> List[dict]:
+        with self._lock:
+            self._rewrite(self._open.values())
+            return [dict(r) for r in self._open.values()]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {k: v for k, v in self._counts.items() if v}
+
+
+class JobQueue:
+    """Bounded queue drained by a fixed pool of worker threads, with an overflow buffer for bursts"""
+
+    def __init__(self, store, workers: int = 4, max_queue: int = 1000, max_attempts: int = 5,
+                 backoff_base: float = 1.0, backoff_max: float = 300.0):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._deferred: "deque[dict]" = deque()
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # Retries waiting for their backoff: heap of (due, seq, record) served by one scheduler thread
+        self._scheduled: List[tuple] = []
+        self._scheduled_seq = itertools.count()
+        self._schedule_cond = threading.Condition()
+        self._processed = {SUCCEEDED: 0, FAILED: 0, "retried": 0}
+
+    def start(self, recover: bool = True):
+        if self._threads:
+            return
+        self._stopping.clear()
+        if recover:
+            # An unreachable database must not stop the app from booting; /test reports it
+            try:
+                records = self.store.unfinished()
+            except Exception:
+                logger.exception("Could not recover unfinished jobs")
+                records = []
+            for record in records:
+                self._put(record)
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._schedule_loop, name="job-scheduler", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the threads; scheduled retries stay queued in the store for the next start"""
+        self._stopping.set()
+        with self._schedule_cond:
+            self._schedule_cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def submit(self, name: str, payload: dict) -> str:
+        return self._submit_many([name], payload)[0]
+
+    def emit(self, event: str, payload: dict) -> List[str]:
+        """Queue every task subscribed to `event`; returns the job ids"""
+        names = _subscriptions.get(event, [])
+        return self._submit_many(names, payload) if names else []
+
+    def _submit_many(self, names: List[str], payload: dict) -> List[str]:
+        now = datetime.now(timezone.utc)
+        records = [
+            {"_id": uuid.uuid4().hex, "name": name, "payload": payload, "status": QUEUED,
+             "attempts": 0, "last_error": None, "created_at": now, "updated_at": now}
+            for name in names
+        ]
+        self.store.create(records)
+        for record in records:
+            self._put(record)
+        return [r["_id"] for r in records]
+
+    def _put(self, record: dict):
+        with self._lock:
+            # Keep FIFO order: once anything is deferred, newer jobs queue up behind it
+            if not self._deferred:
+                try:
+                    self._queue.put_nowait(record)
+                    return
+                except queue.Full:
+                    logger.warning("Job queue full, deferring jobs until workers catch up")
+            self._deferred.append(record)
+
+    def _drain_deferred(self):
+        with self._lock:
+            while self._deferred:
+                try:
+                    self._queue.put_nowait(self._deferred[0])
+                except queue.Full:
+                    return
+                self._deferred.popleft()
+
+    def _retry_later(self, record: dict, delay: float):
+        with self._schedule_cond:
+            heapq.heappush(self._scheduled, (time.monotonic() + delay, next(self._scheduled_seq), record))
+            self._schedule_cond.notify()
+
+    def _schedule_loop(self):
+        while not self._stopping.is_set():
+            due = []
+            with self._schedule_cond:
+                now = time.monotonic()
+                while self._scheduled and self._scheduled[0][0] <= now:
+                    due.append(heapq.heappop(self._scheduled)[2])
+                if not due:
+                    wait = self._scheduled[0][0] - now if self._scheduled else None
+                    self._schedule_cond.wait(wait)
+            for record in due:
+                self._put(record)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._drain_deferred()
+            try:
+                record = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._in_flight += 1
+            try:
+                self._execute(record)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                self._queue.task_done()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (max(attempts, 1) - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _execute(self, record: dict):
+        # Store errors (e.g. a transient Mongo failure) go through the same backoff as task
+        # errors instead of leaving the job queued in the store until the next restart
+        try:
+            self._run_task(record)
+        except Exception:
+            logger.exception("Job %s (%s) hit a store error, retrying", record.get("name"), record.get("_id"))
+            self._retry_later(record, self._backoff(record.get("attempts", 0)))
+
+    def _run_task(self, record: dict):
+        attempts = record.get("attempts", 0) + 1
+        self.store.update(record["_id"], {"status": RUNNING, "attempts": attempts,
+                                          "updated_at": datetime.now(timezone.utc)})
+        # Only count the attempt once the task is actually about to run
+        record["attempts"] = attempts
+        fn = _tasks.get(record["name"])
+        try:
+            if fn is None:
+                raise LookupError(f"Unknown task '{record['name']}'")
+            fn(record["payload"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)[:200]}"
+            if fn is not None and record["attempts"] < self.max_attempts:
+                delay = self._backoff(record["attempts"])
+                self.store.update(record["_id"], {"status": QUEUED, "last_error": error,
+                                                  "updated_at": datetime.now(timezone.utc)})
+                with self._lock:
+                    self._processed["retried"] += 1
+                self._retry_later(record, delay)
+            else:
+                logger.error("Job %s (%s) failed after %d attempts: %s", record["name"], record["_id"], record["attempts"], error)
+                self.store.update(record["_id"], {"status": FAILED, "last_error": error,
+                                                  "updated_at": datetime.now(timezone.utc)})
+                with self._lock:
+                    self._processed[FAILED] += 1
+            return
+        self.store.update(record["_id"], {"status": SUCCEEDED, "updated_at": datetime.now(timezone.utc)})
+        with self._lock:
+            self._processed[SUCCEEDED] += 1
+
+    def stats(self) -> dict:
+        with self._schedule_cond:
+            scheduled = len(self._scheduled)
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "deferred": len(self._deferred),
+                "in_flight": self._in_flight,
+                "awaiting_retry": scheduled,
+                "processed": dict(self._processed),
+                "tasks": sorted(_tasks),
+            }
+
+
+def _default_store():
+    if db is not None:
+        return MongoJobStore(db["job"])
+    return FileJobStore(os.getenv("JOBS_FILE", "logs/jobs.jsonl"))
+
+
+job_queue = JobQueue(
+    _default_store(),
+    workers=int(os.getenv("JOB_WORKERS", 4)),
+    max_queue=int(os.getenv("JOB_QUEUE_SIZE", 1000)),
+)
@@ -1,10 +1,18 @@
+import logging
 import os
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+from typing import List, Literal, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from database import db, create_document, get_documents
 from schemas import Vehicle, Testimonial, Booking
+from pricing import quote
+from catalog import catalog_version, invalidate_catalog, get_vehicles_by_slug
+from encoding import encoded_response
+from jobs import job_queue
+import analytics  # registers the booking rollup task
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Royer Exotics API", version="1.1.0")
 
@@ -17,6 +25,16 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def start_background_jobs():
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    job_queue.stop()
+
+
 @app.get("/")
 def root():
     return {"name": "Royer Exotics API", "status": "ok"}
@@ -293,29 +311,63 @@ def seed_data():
             create_document("testimonial", t)
             inserted["testimonials"] += 1
 
+    if inserted["vehicles"]:
+        invalidate_catalog()
+
     return {"inserted": inserted}
 
 
 # Public API
+# Negotiates gzip/brotli and msgpack; encoded bodies are cached per catalog version
 @app.get("/vehicles", response_model=List[Vehicle])
-def list_vehicles(category: Optional[str] = None):
+def list_vehicles(request: Request, category: Optional[str] = None):
     filt = {"category": category} if category and category != 'all' else {}
-    docs = get_documents("vehicle", filt)
-    clean = []
-    for d in docs:
-        d.pop("_id", None)
-        clean.append(Vehicle(**d))
-    return clean
+
+    def load():
+        docs = get_documents("vehicle", filt)
+        clean = []
+        for d in docs:
+            d.pop("_id", None)
+            clean.append(Vehicle(**d).model_dump(mode="json"))
+        return clean
+
+    return encoded_response(request, catalog_version(), ("vehicles", filt.get("category", "all")), load)
+
+
+class VehicleBatchRequest(BaseModel):
+    slugs: List[str] = Field(..., max_length=1000)
+
+
+class VehicleBatchResponse(BaseModel):
+    vehicles: List[Vehicle]
+    missing: List[str]
+
+
+def _vehicle_batch(slugs: List[str]) -> VehicleBatchResponse:
+    docs, missing = get_vehicles_by_slug([s for s in slugs if s])
+    return VehicleBatchResponse(vehicles=[Vehicle(**d) for d in docs], missing=missing)
+
+
+# Declared before /vehicles/{slug} so "batch" is not treated as a slug
+@app.get("/vehicles/batch", response_model=VehicleBatchResponse)
+def get_vehicles_batch(slugs: str = ""):
+    parts = [s.strip() for s in slugs.split(",")]
+    if len(parts) > 200:
+        raise HTTPException(status_code=400, detail="Too many slugs, use POST /vehicles/batch")
+    return _vehicle_batch(parts)
+
+
+@app.post("/vehicles/batch", response_model=VehicleBatchResponse)
+def post_vehicles_batch(payload: VehicleBatchRequest):
+    return _vehicle_batch(payload.slugs)
 
 
 @app.get("/vehicles/{slug}", response_model=Vehicle)
 def get_vehicle(slug: str):
-    docs = get_documents("vehicle", {"slug": slug})
+    docs, _ = get_vehicles_by_slug([slug])
     if not docs:
         raise HTTPException(status_code=404, detail="Vehicle not found")
-    d = docs[0]
-    d.pop("_id", None)
-    return Vehicle(**d)
+    return Vehicle(**docs[0])
 
 
 @app.get("/categories", response_model=List[str])
@@ -349,10 +401,81 @@ class BookingResponse(BaseModel):
 
 @app.post("/book", response_model=BookingResponse)
 def book_now(payload: Booking):
-    create_document("booking", payload)
+    booking_id = create_document("booking", payload)
+    # Follow-up work (emails, CRM sync, analytics) runs on the background job queue.
+    # The booking is already stored, so a failure here must not turn into a 500 and a duplicate retry.
+    # Job records only carry the id and routing fields; tasks needing contact details load the booking.
+    try:
+        job_queue.emit("booking.created", {
+            "booking_id": booking_id,
+            "vehicle_slug": payload.vehicle_slug,
+            "source": payload.source,
+        })
+    except Exception:
+        logger.exception("Could not queue follow-up jobs for booking %s", booking_id)
     return BookingResponse(status="ok", message="Your request has been received. Our team will contact you shortly.")
 
 
+class QuoteRequest(BaseModel):
+    vehicle_slug: str
+    start_date: str = Field(..., description="ISO date, first rental day")
+    end_date: str = Field(..., description="ISO date, return day")
+    fulfillment: Literal["pickup", "delivery"] = Field("pickup", description="pickup | delivery; delivery adds the delivery fee")
+    delivery: Optional[str] = Field(None, description="Pickup location or delivery address")
+
+
+class QuoteBatch(BaseModel):
+    items: List[QuoteRequest] = Field(..., max_length=1000)
+
+
+class Quote(BaseModel):
+    vehicle_slug: str
+    start_date: str
+    end_date: str
+    currency: str
+    days: Optional[int] = None
+    price_per_day: Optional[float] = None
+    weekend_days: Optional[int] = None
+    base: Optional[float] = None
+    subtotal: Optional[float] = None
+    discount_rate: Optional[float] = None
+    discount: Optional[float] = None
+    delivery_fee: Optional[float] = None
+    total: Optional[float] = None
+    error: Optional[str] = None
+
+
+class QuoteBatchResponse(BaseModel):
+    quotes: List[Quote]
+
+
+@app.post("/quotes", response_model=QuoteBatchResponse)
+def create_quotes(payload: QuoteBatch):
+    try:
+        results = quote([item.model_dump() for item in payload.items])
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e)[:200])
+    return QuoteBatchResponse(quotes=[Quote(**r) for r in results])
+
+
+@app.get("/admin/jobs")
+def job_stats():
+    stats = job_queue.stats()
+    try:
+        stats["records"] = job_queue.store.counts()
+    except Exception as e:
+        stats["records"] = f"❌ Error: {str(e)[:80]}"
+    return stats
+
+
+@app.get("/admin/analytics")
+def booking_analytics(days: int = Query(30, ge=1, le=366), top: int = Query(20, ge=1, le=200)):
+    try:
+        return analytics.summary(days, top)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e)[:200])
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -0,0 +1,138 @@
+"""
+Rental Pricing Engine
+
+Prices many (slug, start, end, fulfillment) requests in one pass. Every rental day of
+every request is expanded into a single NumPy array, so weekday/weekend and seasonal
+multipliers are applied with array arithmetic instead of per-day Python loops.
+
+Daily rates come from the shared per-slug vehicle cache (`catalog.get_vehicles_by_slug`),
+so a comparison page re-pricing the same cars only hits the database for slugs it
+has not seen recently.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from catalog import get_vehicles_by_slug
+
+CURRENCY = "USD"
+MAX_RENTAL_DAYS = 90
+
+# Friday and Saturday nights carry the weekend surcharge (Monday == 0)
+WEEKEND_DAYS = np.array([4, 5])
+WEEKEND_MULTIPLIER = 1.15
+
+# Seasonal multiplier by calendar month, January first
+SEASONAL_MULTIPLIERS = np.array([1.0, 1.0, 1.05, 1.05, 1.1, 1.15, 1.2, 1.2, 1.05, 1.0, 1.05, 1.25])
+
+# Multi-day discount tiers: rentals of at least DISCOUNT_MIN_DAYS[i] days get DISCOUNT_RATES[i] off
+DISCOUNT_MIN_DAYS = np.array([0, 3, 7, 14, 28])
+DISCOUNT_RATES = np.array([0.0, 0.05, 0.10, 0.15, 0.20])
+
+DELIVERY_FEE = 150.0
+
+
+def _daily_rates(slugs: Iterable[str]) -> Dict[str, float]:
+    docs, _ = get_vehicles_by_slug(list(slugs))
+    return {d["slug"]: float(d["price_per_day"]) for d in docs}
+
+
+def price_rentals(prices: np.ndarray, starts: np.ndarray, days: np.ndarray, delivery: np.ndarray) -> Dict[str, np.ndarray]:
+    """Vectorized price computation.
+
+    prices: daily rate per rental, starts: datetime64[D] first day, days: rental length (>= 1),
+    delivery: bool per rental. Returns arrays aligned with the inputs.
+    """
+    n = len(prices)
+    # Expand every rental into one row per rental day
+    rental_idx = np.repeat(np.arange(n), days)
+    first_row = np.repeat(np.cumsum(days) - days, days)
+    day_dates = np.repeat(starts, days) + (np.arange(rental_idx.size) - first_row)
+
+    # 1970-01-01 was a Thursday (weekday 3)
+    weekday = (day_dates.astype("int64") + 3) % 7
+    month = day_dates.astype("datetime64[M]").astype("int64") % 12
+    is_weekend = np.isin(weekday, WEEKEND_DAYS)
+
+    day_rates = prices[rental_idx] * SEASONAL_MULTIPLIERS[month] * np.where(is_weekend, WEEKEND_MULTIPLIER, 1.0)
+    subtotal = np.bincount(rental_idx, weights=day_rates, minlength=n)
+    weekend_days = np.bincount(rental_idx, weights=is_weekend, minlength=n).astype("int64")
+
+    discount_rate = DISCOUNT_RATES[np.searchsorted(DISCOUNT_MIN_DAYS, days, side="right") - 1]
+    discount = np.round(subtotal * discount_rate, 2)
+    subtotal = np.round(subtotal, 2)
+    delivery_fee = np.where(delivery, DELIVERY_FEE, 0.0)
+    return {
+        "base": np.round(prices * days, 2),
+        "subtotal": subtotal,
+        "weekend_days": weekend_days,
+        "discount_rate": discount_rate,
+        "discount": discount,
+        "delivery_fee": delivery_fee,
+        "total": np.round(subtotal - discount + delivery_fee, 2),
+    }
+
+
+def quote(requests: Sequence[dict]) -> List[dict]:
+    """Price a batch of {vehicle_slug, start_date, end_date, fulfillment} requests.
+
+    `fulfillment` is "pickup" (the default) or "delivery"; only delivery pays
+    DELIVERY_FEE. The free-text `delivery` address is not used for pricing. Returns one result per request in the same order. Invalid requests (unknown slug,
+    bad dates) get an `error` message instead of prices; they never fail the batch.
+    """
+    results: List[dict] = [
+        {
+            "vehicle_slug": r.get("vehicle_slug"),
+            "start_date": r.get("start_date"),
+            "end_date": r.get("end_date"),
+            "currency": CURRENCY,
+        }
+        for r in requests
+    ]
+    rates = _daily_rates(r.get("vehicle_slug") for r in requests if r.get("vehicle_slug"))
+
+    valid, prices, starts, days, delivery = [], [], [], [], []
+    for i, r in enumerate(requests):
+        try:
+            start = date.fromisoformat(r.get("start_date") or "")
+            end = date.fromisoformat(r.get("end_date") or "")
+        except ValueError:
+            results[i]["error"] = "start_date and end_date must be ISO dates"
+            continue
+        length = max((end - start).days, 1)
+        if end < start:
+            results[i]["error"] = "end_date is before start_date"
+        elif length > MAX_RENTAL_DAYS:
+            results[i]["error"] = f"Rentals are limited to {MAX_RENTAL_DAYS} days"
+        elif r.get("vehicle_slug") not in rates:
+            results[i]["error"] = "Vehicle not found"
+        else:
+            valid.append(i)
+            prices.append(rates[r["vehicle_slug"]])
+            starts.append(start)
+            days.append(length)
+            delivery.append(r.get("fulfillment") == "delivery")
+
+    if not valid:
+        return results
+
+    priced = price_rentals(
+        np.array(prices, dtype="float64"),
+        np.array(starts, dtype="datetime64[D]"),
+        np.array(days, dtype="int64"),
+        np.array(delivery, dtype=bool),
+    )
+    for row, i in enumerate(valid):
+        results[i].update(
+            days=days[row],
+            price_per_day=prices[row],
+            weekend_days=int(priced["weekend_days"][row]),
+            base=float(priced["base"][row]),
+            subtotal=float(priced["subtotal"][row]),
+            discount_rate=float(priced["discount_rate"][row]),
+            discount=float(priced["discount"][row]),
+            delivery_fee=float(priced["delivery_fee"][row]),
+            total=float(priced["total"][row]),
+        )
+    return results
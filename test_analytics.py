@@ -0,0 +1,117 @@
+"""
+Booking analytics tests
+
+Runs the rollup task against mongomock, which has no transactions, so these cover
+the marker-first path with compensation used on standalone servers.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import analytics
+
+CATEGORIES = {"huracan-evo": "supercar", "g63": "suv"}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(analytics, "db", database)
+    monkeypatch.setattr(analytics, "_indexes_ready", False)
+    monkeypatch.setattr(analytics, "_transactions", False)
+    monkeypatch.setattr(analytics, "get_vehicles_by_slug", lambda slugs: (
+        [{"slug": s, "category": CATEGORIES[s]} for s in slugs if s in CATEGORIES],
+        [s for s in slugs if s not in CATEGORIES],
+    ))
+    return database
+
+
+def book(db, slug: str, source: str = "web", created_at: datetime = None) -> dict:
+    created_at = created_at or datetime.now(timezone.utc)
+    booking_id = str(db["booking"].insert_one({"vehicle_slug": slug, "source": source, "created_at": created_at}).inserted_id)
+    return {"booking_id": booking_id, "vehicle_slug": slug, "source": source}
+
+
+def test_rollup_counts_by_created_at(db):
+    payload = book(db, "huracan-evo", "whatsapp", datetime(2026, 3, 31, 23, 30, tzinfo=timezone.utc))
+    analytics.rollup_booking(payload)
+
+    day = db[analytics.DAILY_COLLECTION].find_one({"_id": "2026-03-31"})
+    assert day["total"] == 1
+    assert day["by_category"] == {"supercar": 1}
+    assert day["by_source"] == {"whatsapp": 1}
+    vehicle = db[analytics.VEHICLE_COLLECTION].find_one({"month": "2026-03", "slug": "huracan-evo"})
+    assert vehicle["n"] == 1
+
+
+def test_retried_rollup_counts_once(db):
+    payload = book(db, "g63")
+    analytics.rollup_booking(payload)
+    analytics.rollup_booking(payload)
+
+    assert [d["total"] for d in db[analytics.DAILY_COLLECTION].find()] == [1]
+    assert [d["n"] for d in db[analytics.VEHICLE_COLLECTION].find()] == [1]
+
+
+def test_concurrent_attempt_loses_on_the_marker(db, monkeypatch):
+    payload = book(db, "g63")
+    lookup = analytics.get_vehicles_by_slug
+
+    def racing_lookup(slugs):
+        # Another worker counts the same booking between our marker check and our writes
+        monkeypatch.setattr(analytics, "get_vehicles_by_slug", lookup)
+        analytics.rollup_booking(payload)
+        return lookup(slugs)
+
+    monkeypatch.setattr(analytics, "get_vehicles_by_slug", racing_lookup)
+    analytics.rollup_booking(payload)
+
+    assert [d["total"] for d in db[analytics.DAILY_COLLECTION].find()] == [1]
+    assert db[analytics.MARKER_COLLECTION].count_documents({}) == 1
+
+
+def test_failed_write_is_compensated(db, monkeypatch):
+    payload = book(db, "huracan-evo")
+    vehicles = db[analytics.VEHICLE_COLLECTION]
+    update_one = vehicles.update_one
+
+    def failing_update(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+
+    monkeypatch.setattr(vehicles, "update_one", failing_update)
+    with pytest.raises(ConnectionError):
+        analytics.rollup_booking(payload)
+
+    day = db[analytics.DAILY_COLLECTION].find_one()
+    assert day["total"] == 0
+    assert set(day["by_category"].values()) == {0}
+    assert db[analytics.MARKER_COLLECTION].count_documents({}) == 0
+
+    # The job queue's retry then counts it exactly once
+    monkeypatch.setattr(vehicles, "update_one", update_one)
+    analytics.rollup_booking(payload)
+    assert db[analytics.DAILY_COLLECTION].find_one()["total"] == 1
+    assert vehicles.find_one()["n"] == 1
+
+
+def test_summary(db):
+    now = datetime.now(timezone.utc)
+    for slug, source in [("huracan-evo", "web"), ("huracan-evo", "phone"), ("g63", "web"), ("unlisted", None)]:
+        analytics.rollup_booking(book(db, slug, source, now))
+    analytics.rollup_booking(book(db, "g63", "web", now - timedelta(days=40)))
+
+    result = analytics.summary(days=7, top_vehicles=2)
+    assert result["to"] == now.date().isoformat()
+    assert len(result["per_day"]) == 7
+    assert result["per_day"][-1] == {"day": now.date().isoformat(), "total": 4}
+    assert result["total"] == 4
+    assert result["by_category"] == {"supercar": 2, "suv": 1, "unknown": 1}
+    assert result["by_source"] == {"web": 2, "phone": 1, "unknown": 1}
+
+    month = now.strftime("%Y-%m")
+    assert month in result["top_vehicles_by_month"]
+    top = result["top_vehicles_by_month"][month]
+    assert top[0] == {"vehicle_slug": "huracan-evo", "bookings": 2}
+    assert len(top) == 2
@@ -0,0 +1,79 @@
+"""
+Vehicle catalog lookup tests
+
+`get_documents` is replaced with an in-memory collection that records each query.
+"""
+import pytest
+
+import catalog
+
+VEHICLES = [
+    {"_id": i, "slug": slug, "category": category, "price_per_day": price}
+    for i, (slug, category, price) in enumerate([
+        ("huracan-evo", "supercar", 1299),
+        ("g63", "suv", 899),
+        ("720s", "supercar", 1499),
+    ])
+]
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    seen = []
+
+    def get_documents(collection_name, filter_dict=None, limit=None):
+        assert collection_name == "vehicle"
+        wanted = filter_dict["slug"]["$in"]
+        seen.append(list(wanted))
+        return [dict(v) for v in VEHICLES if v["slug"] in wanted]
+
+    monkeypatch.setattr(catalog, "get_documents", get_documents)
+    monkeypatch.setattr(catalog, "vehicle_cache", catalog.VehicleCache())
+    return seen
+
+
+def test_results_follow_request_order(queries):
+    docs, missing = catalog.get_vehicles_by_slug(["720s", "nope", "huracan-evo", "gone"])
+    assert [d["slug"] for d in docs] == ["720s", "huracan-evo"]
+    assert missing == ["nope", "gone"]
+    assert all("_id" not in d for d in docs)
+
+
+def test_duplicates_are_resolved_once(queries):
+    docs, missing = catalog.get_vehicles_by_slug(["g63", "g63", "720s", "g63"])
+    assert [d["slug"] for d in docs] == ["g63", "720s"]
+    assert missing == []
+    assert queries == [["g63", "720s"]]
+
+
+def test_cached_slugs_skip_the_database(queries):
+    catalog.get_vehicles_by_slug(["g63"])
+    docs, _ = catalog.get_vehicles_by_slug(["huracan-evo", "g63"])
+    assert [d["slug"] for d in docs] == ["huracan-evo", "g63"]
+    assert queries == [["g63"], ["huracan-evo"]]
+
+    catalog.get_vehicles_by_slug(["g63", "huracan-evo"])
+    assert len(queries) == 2
+
+
+def test_missing_slugs_are_looked_up_again(queries):
+    catalog.get_vehicles_by_slug(["nope"])
+    catalog.get_vehicles_by_slug(["nope"])
+    assert queries == [["nope"], ["nope"]]
+
+
+def test_entries_expire(queries, monkeypatch):
+    catalog.get_vehicles_by_slug(["g63"])
+    now = catalog.time.monotonic()
+    monkeypatch.setattr(catalog.time, "monotonic", lambda: now + catalog.vehicle_cache.ttl_seconds + 1)
+    catalog.get_vehicles_by_slug(["g63"])
+    assert queries == [["g63"], ["g63"]]
+
+
+def test_invalidate_catalog_bumps_version_and_clears_cache(queries):
+    version = catalog.catalog_version()
+    catalog.get_vehicles_by_slug(["g63"])
+    catalog.invalidate_catalog()
+    assert catalog.catalog_version() == version + 1
+    catalog.get_vehicles_by_slug(["g63"])
+    assert queries == [["g63"], ["g63"]]
@@ -0,0 +1,124 @@
+"""
+Response encoding tests
+
+Content negotiation and the per-version encoded body cache, with a stub request.
+"""
+import gzip
+import json
+
+import pytest
+
+import encoding
+
+
+class StubRequest:
+    def __init__(self, **headers):
+        self.headers = {k.replace("_", "-"): v for k, v in headers.items()}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(encoding, "encoded_cache", encoding.EncodedCache())
+
+
+@pytest.fixture
+def catalog():
+    calls = []
+
+    def produce():
+        calls.append(1)
+        return [{"slug": f"car-{i}", "name": "Lamborghini Huracan EVO", "price_per_day": 1299} for i in range(50)]
+
+    produce.calls = calls
+    return produce
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", "identity"),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0", "identity"),
+    ("*", "br"),
+    ("*;q=0.5, gzip;q=0.8", "gzip"),
+    ("deflate", "identity"),
+])
+def test_choose_encoding(accept_encoding, expected):
+    assert encoding.choose_encoding(accept_encoding) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(encoding, "brotli", None)
+    assert encoding.choose_encoding("br, gzip;q=0.5") == "gzip"
+    assert encoding.choose_encoding("br") == "identity"
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", encoding.JSON),
+    ("application/json", encoding.JSON),
+    ("*/*", encoding.JSON),
+    ("application/msgpack", encoding.MSGPACK),
+    ("application/x-msgpack", encoding.MSGPACK),
+    ("application/json;q=0.9, application/msgpack", encoding.MSGPACK),
+    ("application/json, application/msgpack;q=0.5", encoding.JSON),
+    ("application/msgpack;q=0", encoding.JSON),
+])
+def test_choose_media_type(accept, expected):
+    assert encoding.choose_media_type(accept) == expected
+
+
+def test_choose_media_type_without_msgpack(monkeypatch):
+    monkeypatch.setattr(encoding, "msgpack", None)
+    assert encoding.choose_media_type("application/msgpack") == encoding.JSON
+
+
+def test_large_bodies_are_compressed(catalog):
+    response = encoding.encoded_response(StubRequest(accept_encoding="gzip"), 1, "vehicles", catalog)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert json.loads(gzip.decompress(response.body)) == catalog()
+
+
+def test_small_bodies_are_sent_as_is():
+    response = encoding.encoded_response(StubRequest(accept_encoding="gzip"), 1, "tiny", lambda: {"ok": True})
+    assert "content-encoding" not in response.headers
+    assert json.loads(response.body) == {"ok": True}
+
+
+def test_msgpack_body():
+    msgpack = pytest.importorskip("msgpack")
+    response = encoding.encoded_response(StubRequest(accept="application/msgpack"), 1, "tiny", lambda: {"ok": True})
+    assert response.media_type == encoding.MSGPACK
+    assert msgpack.unpackb(response.body) == {"ok": True}
+
+
+def test_cache_hits_skip_produce(catalog):
+    request = StubRequest(accept_encoding="gzip")
+    first = encoding.encoded_response(request, 1, "vehicles", catalog)
+    second = encoding.encoded_response(request, 1, "vehicles", catalog)
+    # Another encoding of the same version reuses the cached serialized body
+    encoding.encoded_response(StubRequest(accept_encoding="br"), 1, "vehicles", catalog)
+    assert len(catalog.calls) == 1
+    assert second.body == first.body
+
+
+def test_new_version_is_produced_again(catalog):
+    request = StubRequest(accept_encoding="gzip")
+    encoding.encoded_response(request, 1, "vehicles", catalog)
+    encoding.encoded_response(request, 2, "vehicles", catalog)
+    encoding.encoded_response(request, 1, "vehicles?category=supercar", catalog)
+    assert len(catalog.calls) == 3
+
+
+def test_cache_evicts_least_recently_used_and_expired(monkeypatch):
+    cache = encoding.EncodedCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", b"a")
+    cache.put("b", b"b")
+    cache.get("a")
+    cache.put("c", b"c")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a"
+
+    now = encoding.time.monotonic()
+    monkeypatch.setattr(encoding.time, "monotonic", lambda: now + 61)
+    assert cache.get("a") is None
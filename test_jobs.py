@@ -0,0 +1,161 @@
+"""
+Job queue tests
+
+Runs the real worker and scheduler threads against a FileJobStore in a temp directory.
+"""
+import json
+import threading
+import time
+
+import pytest
+
+import jobs
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return jobs.FileJobStore(str(tmp_path / "jobs.jsonl"))
+
+
+@pytest.fixture
+def make_queue(store):
+    started = []
+
+    def make(**kwargs):
+        q = jobs.JobQueue(store, **{"workers": 2, "backoff_base": 0.01, **kwargs})
+        started.append(q)
+        return q
+
+    yield make
+    for q in started:
+        q.stop()
+
+
+@pytest.fixture
+def register(monkeypatch):
+    def register(name, fn):
+        monkeypatch.setitem(jobs._tasks, name, fn)
+    return register
+
+
+def test_overflow_is_deferred_not_dropped(make_queue, store, register):
+    seen = []
+    lock = threading.Lock()
+
+    def record(payload):
+        with lock:
+            seen.append(payload["i"])
+
+    register("test.record", record)
+    q = make_queue(max_queue=2)
+    for i in range(50):
+        q.submit("test.record", {"i": i})
+    assert q.stats()["deferred"] == 48
+
+    q.start(recover=False)
+    assert wait_for(lambda: q.stats()["processed"][jobs.SUCCEEDED] == 50)
+    assert sorted(seen) == list(range(50))
+    assert q.stats()["deferred"] == 0
+    assert store.counts() == {jobs.SUCCEEDED: 50}
+
+
+def test_failed_jobs_retry_until_they_succeed(make_queue, store, register):
+    calls = {}
+
+    def flaky(payload):
+        calls[payload["i"]] = calls.get(payload["i"], 0) + 1
+        if calls[payload["i"]] < 3:
+            raise RuntimeError("try again")
+
+    register("test.flaky", flaky)
+    q = make_queue(workers=1)
+    q.start(recover=False)
+    for i in range(5):
+        q.submit("test.flaky", {"i": i})
+
+    assert wait_for(lambda: q.stats()["processed"][jobs.SUCCEEDED] == 5)
+    assert calls == {i: 3 for i in range(5)}
+    assert q.stats()["processed"]["retried"] == 10
+    assert store.counts() == {jobs.SUCCEEDED: 5}
+
+
+def test_jobs_fail_after_max_attempts(make_queue, store, register):
+    def broken(payload):
+        raise ValueError("bad payload")
+
+    register("test.broken", broken)
+    q = make_queue(max_attempts=3)
+    q.start(recover=False)
+    q.submit("test.broken", {})
+
+    assert wait_for(lambda: q.stats()["processed"][jobs.FAILED] == 1)
+    assert q.stats()["processed"]["retried"] == 2
+    assert store.counts() == {jobs.FAILED: 1}
+    assert store.unfinished() == []
+
+
+def test_store_errors_are_retried(make_queue, store, register, monkeypatch):
+    ran = []
+    register("test.ok", lambda payload: ran.append(payload))
+    update = store.update
+    failures = {"left": 2}
+
+    def unreliable_update(job_id, fields):
+        if fields.get("status") == jobs.RUNNING and failures["left"]:
+            failures["left"] -= 1
+            raise ConnectionError("store unavailable")
+        update(job_id, fields)
+
+    monkeypatch.setattr(store, "update", unreliable_update)
+    q = make_queue(workers=1)
+    q.start(recover=False)
+    q.submit("test.ok", {"i": 1})
+
+    assert wait_for(lambda: q.stats()["processed"][jobs.SUCCEEDED] == 1)
+    assert ran == [{"i": 1}]
+    assert failures["left"] == 0
+
+
+def test_unfinished_jobs_are_recovered_and_file_compacted(tmp_path, register):
+    path = str(tmp_path / "jobs.jsonl")
+    first = jobs.JobQueue(jobs.FileJobStore(path))
+    done, pending = first.submit("test.noop", {"i": 0}), first.submit("test.noop", {"i": 1})
+    first.store.update(done, {"status": jobs.SUCCEEDED})
+
+    ran = []
+    register("test.noop", lambda payload: ran.append(payload["i"]))
+    second = jobs.JobQueue(jobs.FileJobStore(path), workers=1)
+    try:
+        with open(path) as f:
+            assert len(f.readlines()) == 3
+        second.start()
+        assert wait_for(lambda: second.stats()["processed"][jobs.SUCCEEDED] == 1)
+        assert ran == [1]
+    finally:
+        second.stop()
+    # Start compacted the file to the unfinished job; this run only appended to it
+    with open(path) as f:
+        ids = {json.loads(line)["_id"] for line in f}
+    assert ids == {pending}
+
+
+def test_torn_lines_are_skipped_and_rewritten(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    good = {"_id": "a", "name": "test.noop", "payload": {}, "status": jobs.QUEUED, "attempts": 0}
+    path.write_text(json.dumps(good) + "\n" + '{"_id": "b", "name": "test.no')
+
+    store = jobs.FileJobStore(str(path))
+    assert [r["_id"] for r in store.unfinished()] == ["a"]
+    store.update("a", {"status": jobs.SUCCEEDED})
+    for line in path.read_text().splitlines():
+        json.loads(line)
+    assert store.counts() == {jobs.SUCCEEDED: 1}
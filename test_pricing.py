@@ -0,0 +1,109 @@
+"""
+Pricing engine tests
+
+Checks the vectorized rules against hand-computed totals and a per-day reference loop.
+"""
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import pricing
+
+RATE = 100.0
+
+
+def reference_total(price: float, start: date, days: int, delivery: bool) -> float:
+    subtotal = 0.0
+    for i in range(days):
+        d = start + timedelta(days=i)
+        rate = price * float(pricing.SEASONAL_MULTIPLIERS[d.month - 1])
+        if d.weekday() in pricing.WEEKEND_DAYS:
+            rate *= pricing.WEEKEND_MULTIPLIER
+        subtotal += rate
+    tier = max(i for i, m in enumerate(pricing.DISCOUNT_MIN_DAYS) if days >= m)
+    discount = round(subtotal * float(pricing.DISCOUNT_RATES[tier]), 2)
+    return round(round(subtotal, 2) - discount + (pricing.DELIVERY_FEE if delivery else 0.0), 2)
+
+
+@pytest.fixture
+def rates(monkeypatch):
+    monkeypatch.setattr(pricing, "_daily_rates", lambda slugs: {"car": RATE})
+
+
+def one(start: str, end: str, slug="car", **extra) -> dict:
+    return pricing.quote([{"vehicle_slug": slug, "start_date": start, "end_date": end, **extra}])[0]
+
+
+def test_weekday_in_flat_season(rates):
+    q = one("2025-01-06", "2025-01-07")  # Monday, January
+    assert q["days"] == 1
+    assert q["weekend_days"] == 0
+    assert q["total"] == 100.0
+
+
+def test_weekend_multiplier(rates):
+    q = one("2025-01-10", "2025-01-12")  # Friday and Saturday
+    assert q["weekend_days"] == 2
+    assert q["subtotal"] == 230.0
+    assert q["total"] == 230.0
+
+
+def test_seasonal_multiplier(rates):
+    assert one("2025-07-07", "2025-07-08")["total"] == 120.0  # Monday, July
+    assert one("2025-12-01", "2025-12-02")["total"] == 125.0  # Monday, December
+
+
+def test_same_day_rental_is_one_day(rates):
+    q = one("2025-01-06", "2025-01-06")
+    assert q["days"] == 1
+    assert q["total"] == 100.0
+
+
+@pytest.mark.parametrize("days, rate", [
+    (2, 0.0), (3, 0.05), (6, 0.05), (7, 0.10), (13, 0.10), (14, 0.15), (27, 0.15), (28, 0.20), (90, 0.20),
+])
+def test_discount_tier_boundaries(days, rate):
+    priced = pricing.price_rentals(
+        np.array([RATE]), np.array(["2025-01-06"], dtype="datetime64[D]"), np.array([days]), np.array([False])
+    )
+    assert priced["discount_rate"][0] == rate
+
+
+@pytest.mark.parametrize("extra, fee", [
+    ({}, 0.0),
+    ({"fulfillment": "pickup"}, 0.0),
+    ({"fulfillment": "pickup", "delivery": "West Hollywood, CA"}, 0.0),
+    ({"fulfillment": "delivery", "delivery": "LAX"}, 150.0),
+    ({"fulfillment": "delivery"}, 150.0),
+])
+def test_delivery_fee_follows_fulfillment(rates, extra, fee):
+    assert one("2025-01-06", "2025-01-07", **extra)["delivery_fee"] == fee
+
+
+def test_invalid_requests_get_errors(rates):
+    assert one("2025-01-07", "2025-01-06")["error"] == "end_date is before start_date"
+    assert one("not-a-date", "2025-01-06")["error"] == "start_date and end_date must be ISO dates"
+    assert one("2025-01-01", "2025-06-01")["error"] == "Rentals are limited to 90 days"
+    assert one("2025-01-06", "2025-01-07", slug="unknown")["error"] == "Vehicle not found"
+
+
+def test_matches_per_day_reference():
+    rng = random.Random(7)
+    requests, expected = [], []
+    for _ in range(500):
+        price = float(rng.randrange(199, 2999))
+        start = date(2025, 1, 1) + timedelta(days=rng.randint(0, 730))
+        days = rng.randint(1, 60)
+        delivery = rng.random() < 0.5
+        requests.append((price, start, days, delivery))
+        expected.append(reference_total(price, start, days, delivery))
+
+    priced = pricing.price_rentals(
+        np.array([r[0] for r in requests]),
+        np.array([r[1] for r in requests], dtype="datetime64[D]"),
+        np.array([r[2] for r in requests]),
+        np.array([r[3] for r in requests]),
+    )
+    assert priced["total"].tolist() == pytest.approx(expected, abs=0.011)